@@ -67,7 +67,7 @@ class EnhancedReceiptRenderer(ReceiptRenderer):
     def _draw_text_with_tracking(self, draw: ImageDraw.Draw, element, template: ReceiptTemplate, scale: int):
         """Draw text and track its position."""
         # Scale font size
-        font = self._get_font(element.font_size * scale, element.bold, element.type.value)
+        font = self._get_font(element.font_size * scale, element.bold, element.element_type)
 
         # Process text content
         text_content = str(element.content)
@@ -1,5 +1,6 @@
 import json
 import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 from PIL import Image
@@ -144,29 +145,37 @@ class ReceiptGenerator:
             (self.output_dir / "images").mkdir(exist_ok=True)
             (self.output_dir / "metadata").mkdir(exist_ok=True)
 
-        for i in range(count):
-            store_type = store_types[i % len(store_types)]
+        # PNG encoding runs on worker threads so the next receipt renders meanwhile
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            save_futures = []
 
-            # Generate receipt
-            img, metadata = self.generate_single(store_type=store_type)
+            for i in range(count):
+                store_type = store_types[i % len(store_types)]
 
-            if save:
-                # Save image
-                img_path = self.output_dir / "images" / f"{metadata['id']}.png"
-                img.save(img_path)
+                # Generate receipt
+                img, metadata = self.generate_single(store_type=store_type)
 
-                # Save metadata
-                meta_path = self.output_dir / "metadata" / f"{metadata['id']}.json"
-                with open(meta_path, 'w') as f:
-                    json.dump(metadata, f, indent=2)
+                if save:
+                    # Save image
+                    img_path = self.output_dir / "images" / f"{metadata['id']}.png"
+                    save_futures.append(executor.submit(img.save, img_path))
 
-                # Update metadata with file path
-                metadata["image_path"] = str(img_path)
+                    # Save metadata
+                    meta_path = self.output_dir / "metadata" / f"{metadata['id']}.json"
+                    with open(meta_path, 'w') as f:
+                        json.dump(metadata, f, indent=2)
 
-            results.append((img, metadata))
+                    # Update metadata with file path
+                    metadata["image_path"] = str(img_path)
 
-            if (i + 1) % 10 == 0:
-                print(f"Generated {i + 1}/{count} receipts")
+                results.append((img, metadata))
+
+                if (i + 1) % 10 == 0:
+                    print(f"Generated {i + 1}/{count} receipts")
+
+            # Surface any save errors
+            for future in save_futures:
+                future.result()
 
         # Save summary
         if save:
@@ -3,9 +3,27 @@ from typing import Dict, List, Tuple, Optional
 import os
 import random
 from pathlib import Path
-from .templates import ReceiptTemplate, ElementType, Alignment
+from .templates import ReceiptTemplate, ElementType, Alignment, ElementRole
 from .fonts import FontManager, FontCategory, TextVariations
 
+# Font configuration section used for each element role
+_ROLE_FONT_CONFIG = {
+    ElementRole.STORE_NAME: "header",
+    ElementRole.ADDRESS: "header",
+    ElementRole.PHONE: "footer",
+    ElementRole.ITEM_NAME: "items",
+    ElementRole.ITEM_PRICE: "items",
+    ElementRole.QUANTITY: "items",
+    ElementRole.SUBTOTAL: "totals",
+    ElementRole.TAX: "totals",
+    ElementRole.TOTAL: "totals",
+    ElementRole.TRANSACTION: "footer",
+    ElementRole.TIMESTAMP: "footer",
+    ElementRole.THANK_YOU: "footer"
+}
+
+# Roles whose text may be rendered in all caps
+_CAPS_ROLES = frozenset((ElementRole.STORE_NAME, ElementRole.TOTAL, ElementRole.SUBTOTAL))
 
 class ReceiptRenderer:
     def __init__(self, font_dir: Optional[str] = None, use_font_variations: bool = True):
@@ -23,26 +41,11 @@ class ReceiptRenderer:
             self.font_config = None
             self.text_config = None
 
-    def _get_font(self, size: int, bold: bool = False, element_type: str = "items"):
+    def _get_font(self, size: int, bold: bool = False, element_type: ElementRole = ElementRole.ITEM_NAME):
         # Use font manager if available
         if self.use_font_variations and self.font_manager and self.font_config:
             # Get configuration for this element type
-            element_configs = {
-                "store_name": "header",
-                "address": "header",
-                "phone": "footer",
-                "item_name": "items",
-                "item_price": "items",
-                "quantity": "items",
-                "subtotal": "totals",
-                "tax": "totals",
-                "total": "totals",
-                "transaction": "footer",
-                "timestamp": "footer",
-                "thank_you": "footer"
-            }
-
-            config_key = element_configs.get(element_type, "items")
+            config_key = _ROLE_FONT_CONFIG.get(element_type, "items")
             config = self.font_config.get(config_key, {})
 
             # Apply size multiplier
@@ -102,12 +105,12 @@ class ReceiptRenderer:
 
     def _draw_text_scaled(self, draw: ImageDraw.Draw, element, template: ReceiptTemplate, scale: int):
         # Get element type for font selection
-        elem_type = getattr(element, 'element_type', 'text')
+        elem_type = getattr(element, 'element_type', ElementRole.NONE)
 
         # Apply text transformations if configured
         text_content = element.content
-        if self.text_variations and elem_type in ["store_name", "total", "subtotal"]:
-            if self.text_variations.should_use_all_caps(elem_type):
+        if self.text_variations and elem_type in _CAPS_ROLES:
+            if self.text_variations.should_use_all_caps(elem_type.name.lower()):
                 text_content = text_content.upper()
 
         # Scale up font size and get appropriate font
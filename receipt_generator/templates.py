@@ -1,7 +1,13 @@
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, Iterator, List, NamedTuple, Tuple, Optional
 from dataclasses import dataclass, field
-from enum import Enum
+from enum import Enum, IntEnum
+from functools import lru_cache
 import json
+import random
+import string
+import sys
+
+import numpy as np
 
 
 class ElementType(Enum):
@@ -17,8 +23,242 @@ class Alignment(Enum):
     RIGHT = "right"
 
 
-@dataclass
-class ReceiptElement:
+class ElementRole(IntEnum):
+    """Semantic role of an element, used by renderers for font selection."""
+    NONE = 0
+    STORE_NAME = 1
+    ADDRESS = 2
+    PHONE = 3
+    ITEM_NAME = 4
+    ITEM_PRICE = 5
+    TIMESTAMP = 6
+    TRANSACTION = 7
+    THANK_YOU = 8
+    PROMOTIONAL = 9
+    QUANTITY = 10
+    SUBTOTAL = 11
+    TAX = 12
+    TOTAL = 13
+
+
+# Value -> member lookups used when loading templates from dicts
+_ETYPE_MAP = {m.value: m for m in ElementType}
+_ALIGN_MAP = {m.value: m for m in Alignment}
+_ROLE_MAP = {m.value: m for m in ElementRole}
+
+# Member -> value lookups used when serializing templates
+_ET2V = {m: m.value for m in ElementType}
+_AL2V = {m: m.value for m in Alignment}
+_RL2V = {m: m.value for m in ElementRole}
+
+
+# A header layout plan is a tuple of (y, font_size, bold, alignment, element_type, slot)
+# rows with y relative to the top padding. The slot is a (kind, index, max_chars) tuple
+# naming the piece of content that gets stamped into the row.
+LayoutPlan = Tuple[Tuple[int, int, bool, Alignment, ElementRole, Tuple], ...]
+
+# Footer/promo vocabularies, shared instead of rebuilt on every call
+_THANK_YOU_SHORT = ("Thank You", "Come Again", "Have a Great Day", "Thanks!", "Visit Again Soon")
+_THANK_YOU_LONG = (
+    "Thank you for your purchase!",
+    "Thanks for shopping with us",
+    "We appreciate your business",
+    "Thank You!",
+    "Have a nice day!",
+)
+_TX_FORMATS_FMT = ("Transaction: {}", "Trans #{}", "REF: {:.10}", "{}")
+_CASHIERS = ("JOHN", "MARY", "ALEX", "SAM", "#042")
+_PROMO_FONT_SIZES = (7, 8, 9)
+_COUPON_PERCENTS = (10, 15, 20, 25)
+_PUNCTUATION = ('.', '!', '?', '...')
+
+
+def _truncate_text(text: str, max_chars: Optional[int]) -> str:
+    """Truncate text to max_chars (including the trailing ellipsis)."""
+    if max_chars is not None and len(text) > max_chars:
+        return text[:max_chars-3] + "..."
+    return text
+
+
+def _centered_header_layout(plan: list, flags: Tuple, num_address: int) -> int:
+    show_address, multi_line, show_phone = flags
+    plan.append((0, 16, True, Alignment.CENTER, ElementRole.STORE_NAME, ("store", 0, 22)))
+    y_offset = 32  # Increased spacing
+
+    if show_address:
+        if multi_line:
+            for i in range(num_address):
+                plan.append((y_offset, 10, False, Alignment.CENTER, ElementRole.ADDRESS,
+                             ("address", i, None)))
+                y_offset += 15
+        elif num_address > 0:
+            # Combined address on one line
+            plan.append((y_offset, 9, False, Alignment.CENTER, ElementRole.ADDRESS,
+                         ("address_combined", 0, 42)))
+            y_offset += 15
+
+    if show_phone:
+        plan.append((y_offset, 10, False, Alignment.CENTER, ElementRole.PHONE, ("phone", 0, None)))
+        y_offset += 20
+
+    return y_offset
+
+
+def _minimal_header_layout(plan: list, flags: Tuple, num_address: int) -> int:
+    # Just store name, no address/phone
+    plan.append((0, 14, True, Alignment.LEFT, ElementRole.STORE_NAME, ("store_upper", 0, 28)))
+    return 28
+
+
+def _detailed_header_layout(plan: list, flags: Tuple, num_address: int) -> int:
+    # Full details
+    plan.append((0, 16, True, Alignment.CENTER, ElementRole.STORE_NAME, ("store", 0, 22)))
+    y_offset = 32  # Increased spacing
+
+    # All address lines
+    for i in range(num_address):
+        plan.append((y_offset, 10, False, Alignment.CENTER, ElementRole.ADDRESS, ("address", i, 38)))
+        y_offset += 17  # Increased spacing
+
+    # Phone
+    plan.append((y_offset, 10, False, Alignment.CENTER, ElementRole.PHONE, ("phone", 0, 35)))
+    y_offset += 22  # Increased spacing
+
+    if flags[0]:
+        plan.append((y_offset, 8, False, Alignment.CENTER, ElementRole.NONE, ("register", 0, None)))
+        y_offset += 18  # Increased spacing
+
+    return y_offset
+
+
+def _compact_header_layout(plan: list, flags: Tuple, num_address: int) -> int:
+    # Store name and minimal info
+    plan.append((0, 15, True, Alignment.CENTER, ElementRole.STORE_NAME, ("store", 0, 25)))
+    y_offset = 28  # Increased spacing
+
+    if flags[0] and num_address > 1:
+        # City, State ZIP
+        plan.append((y_offset, 9, False, Alignment.CENTER, ElementRole.ADDRESS,
+                     ("address", num_address - 1, 40)))
+        y_offset += 22
+
+    return y_offset
+
+
+# Per-style flag draws and layout builders: centered, minimal, detailed, compact
+_HEADER_FLAGS = (
+    # centered: skip address 20%, one line 40% of the rest, phone 70%
+    lambda r: (r[1] < 0.8, r[1] < 0.8 and r[2] < 0.6, r[3] < 0.7),
+    # minimal
+    lambda r: (),
+    # detailed: store number / register info 30%
+    lambda r: (r[1] < 0.3,),
+    # compact: city/state line 50%
+    lambda r: (r[1] < 0.5,),
+)
+_HEADER_LAYOUTS = (_centered_header_layout, _minimal_header_layout, _detailed_header_layout,
+                   _compact_header_layout)
+
+
+def _draw_header_choices(rng=random) -> Tuple:
+    """Make all random layout decisions for a header up front.
+
+    Returns a small hashable tuple ``(style_index, *flags, separator)`` that
+    fully determines the header layout for a given number of address lines.
+    """
+    _rand = rng.random
+    r = [_rand() for _ in range(5)]
+    style = int(r[0] * len(_HEADER_LAYOUTS))
+
+    # Separator line (80% chance)
+    return (style,) + _HEADER_FLAGS[style](r) + (r[4] < 0.8,)
+
+
+@lru_cache(maxsize=256)
+def _choose_header_layout(choices: Tuple, num_address: int) -> Tuple[LayoutPlan, int]:
+    """Build the header layout plan for a set of choices (pure, cached).
+
+    Returns the plan and the y offset (relative to the top padding) at which
+    the items section should start.
+    """
+    style, flags, separator = choices[0], choices[1:-1], choices[-1]
+    plan = []
+    y_offset = _HEADER_LAYOUTS[style](plan, flags, num_address)
+
+    y_offset += 5
+
+    if separator:
+        plan.append((y_offset, 12, False, Alignment.LEFT, ElementRole.NONE, ("line", 0, None)))
+        y_offset += 10
+    else:
+        y_offset += 5
+
+    return tuple(plan), y_offset
+
+
+PROMO_TYPES = ("website", "survey", "rewards", "random_text", "coupon")
+
+
+def _random_words(count: int, rng=random) -> List[str]:
+    """Generate ``count`` random lowercase "words" of 2-10 letters."""
+    # Draw every character of every word in one go, then slice words out. The
+    # NumPy generator is seeded from rng so random.seed()/--seed still reproduce.
+    gen = np.random.default_rng(rng.getrandbits(64))
+    word_lens = gen.integers(2, 11, size=count)
+    codes = gen.integers(0, 26, size=int(word_lens.sum()), dtype=np.uint8) + 97
+    chars = codes.tobytes().decode('ascii')
+    ends = np.cumsum(word_lens).tolist()
+    starts = [0] + ends[:-1]
+    return [chars[a:b] for a, b in zip(starts, ends)]
+
+
+def _promo_lines(promo_type: str, rng=random) -> Iterator[str]:
+    """Yield the lines of a promotional block, drawing random content only as each line is needed."""
+    if promo_type == "website":
+        # Website promotion
+        yield "Visit us online at"
+        yield f"www.{''.join(rng.choices(string.ascii_lowercase, k=8))}.com"
+        yield "for exclusive deals and offers!"
+    elif promo_type == "survey":
+        # Survey invitation
+        yield "Tell us about your experience!"
+        yield f"Survey Code: {rng.randint(1000, 9999)}-{rng.randint(100, 999)}"
+        yield "Complete online for a chance to win!"
+    elif promo_type == "rewards":
+        # Rewards program
+        yield "Join our rewards program!"
+        yield f"You could have earned {rng.randint(10, 100)} points"
+        yield "Sign up at customer service"
+    elif promo_type == "coupon":
+        # Coupon/discount
+        yield f"Save {rng.choice(_COUPON_PERCENTS)}% on your next visit!"
+        yield f"Coupon code: {''.join(rng.choices(string.ascii_uppercase + string.digits, k=6))}"
+        yield f"Valid until {rng.randint(1, 12)}/{rng.randint(1, 28)}/{rng.randint(24, 25)}"
+    else:  # random_text
+        # Generate random paragraph-like text (gibberish for training)
+        # This helps the model learn to ignore non-essential text
+        _rand, _randint, _choice = rng.random, rng.randint, rng.choice
+        num_lines = _randint(3, 6)  # Increased from 2-4 to 3-6 lines
+        word_counts = [_randint(6, 12) for _ in range(num_lines)]  # Increased from 4-10 words
+        words = _random_words(sum(word_counts), rng)
+
+        pos = 0
+        for num_words in word_counts:
+            line = ' '.join(words[pos:pos + num_words])
+            pos += num_words
+            # Capitalize first letter and maybe add punctuation
+            line = line[0].upper() + line[1:]
+            if _rand() < 0.4:  # Slightly more punctuation
+                line += _choice(_PUNCTUATION)
+            yield line
+
+
+# Per-instance __dict__ is dropped where dataclass(slots=True) is available (3.10+)
+_DATACLASS_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+
+class ReceiptElement(NamedTuple):
+    """One drawable element. A plain tuple underneath: cheap to build, immutable."""
     type: ElementType
     position: Tuple[int, int]
     content: str = ""
@@ -26,10 +266,27 @@ class ReceiptElement:
     bold: bool = False
     alignment: Alignment = Alignment.LEFT
     width: Optional[int] = None
-    element_type: str = "text"  # For font selection (e.g., "store_name", "item_price", etc.)
+    element_type: ElementRole = ElementRole.NONE  # For font selection
+
+
+def _text_element(x: int, y: int, content: str, size: int = 11, bold: bool = False,
+                  align: Alignment = Alignment.LEFT, role: ElementRole = ElementRole.NONE) -> ReceiptElement:
+    return ReceiptElement(ElementType.TEXT, (x, y), content, size, bold, align, None, role)
+
+
+def _line_element(x: int, y: int, width: int) -> ReceiptElement:
+    return ReceiptElement(ElementType.LINE, (x, y), "", 12, False, Alignment.LEFT, width)
 
 
-@dataclass
+# Prototypes for the totals block; only position (and amount content) vary per receipt
+_PROTO_SUBTOTAL = _text_element(0, 0, "Subtotal:")
+_PROTO_TAX = _text_element(0, 0, "Tax:")
+_PROTO_TOTAL = _text_element(0, 0, "TOTAL:", 14, True)
+_PROTO_AMOUNT = _text_element(0, 0, "", 11, False, Alignment.RIGHT)
+_PROTO_TOTAL_AMOUNT = _text_element(0, 0, "", 14, True, Alignment.RIGHT)
+
+
+@dataclass(**_DATACLASS_SLOTS)
 class ReceiptTemplate:
     name: str
     width: int = 300
@@ -40,577 +297,169 @@ class ReceiptTemplate:
     font_family: str = "Arial"
     elements: List[ReceiptElement] = field(default_factory=list)
 
-    def add_header(self, store_name: str, address: List[str], phone: str):
-        import random
-        y_offset = self.padding
-
-        # Helper function to truncate text if too long
-        def truncate_text(text, max_chars):
-            if len(text) > max_chars:
-                return text[:max_chars-3] + "..."
-            return text
-
-        # Randomly choose header style
-        header_style = random.choice(["centered", "minimal", "detailed", "compact"])
-
-        if header_style == "minimal":
-            # Just store name, no address/phone
-            store_display = truncate_text(store_name.upper(), 28)
-            self.elements.append(ReceiptElement(
-                type=ElementType.TEXT,
-                position=(self.padding, y_offset),
-                content=store_display,
-                font_size=14,  # Reduced from 16
-                bold=True,
-                alignment=Alignment.LEFT,
-                element_type="store_name"
-            ))
-            y_offset += 28
-
-        elif header_style == "compact":
-            # Store name and minimal info
-            store_display = truncate_text(store_name, 25)
-            self.elements.append(ReceiptElement(
-                type=ElementType.TEXT,
-                position=(self.width // 2, y_offset),
-                content=store_display,
-                font_size=15,  # Reduced from 18
-                bold=True,
-                alignment=Alignment.CENTER,
-                element_type="store_name"
-            ))
-            y_offset += 28  # Increased spacing
-
-            # Just city/state, no full address (50% chance)
-            if random.random() < 0.5 and len(address) > 1:
-                self.elements.append(ReceiptElement(
-                    type=ElementType.TEXT,
-                    position=(self.width // 2, y_offset),
-                    content=truncate_text(address[-1], 40),  # City, State ZIP
-                    font_size=9,
-                    alignment=Alignment.CENTER,
-                    element_type="address"
-                ))
-                y_offset += 22
-
-        elif header_style == "detailed":
-            # Full details
-            store_display = truncate_text(store_name, 22)
-            self.elements.append(ReceiptElement(
-                type=ElementType.TEXT,
-                position=(self.width // 2, y_offset),
-                content=store_display,
-                font_size=16,  # Reduced from 20
-                bold=True,
-                alignment=Alignment.CENTER,
-                element_type="store_name"
-            ))
-            y_offset += 32  # Increased spacing
-
-            # All address lines
-            for line in address:
-                self.elements.append(ReceiptElement(
-                    type=ElementType.TEXT,
-                    position=(self.width // 2, y_offset),
-                    content=truncate_text(line, 38),
-                    font_size=10,
-                    alignment=Alignment.CENTER,
-                    element_type="address"
-                ))
-                y_offset += 17  # Increased spacing
-
-            # Phone
-            self.elements.append(ReceiptElement(
-                type=ElementType.TEXT,
-                position=(self.width // 2, y_offset),
-                content=truncate_text(phone, 35),
-                font_size=10,
-                alignment=Alignment.CENTER,
-                element_type="phone"
-            ))
-            y_offset += 22  # Increased spacing
-
-            # Sometimes add store number or register info
-            if random.random() < 0.3:
-                self.elements.append(ReceiptElement(
-                    type=ElementType.TEXT,
-                    position=(self.width // 2, y_offset),
-                    content=f"Store #{random.randint(100, 999)} Reg #{random.randint(1, 9)}",
-                    font_size=8,
-                    alignment=Alignment.CENTER
-                ))
-                y_offset += 18  # Increased spacing
-
-        else:  # centered (standard)
-            # Store name
-            store_display = truncate_text(store_name, 22)
-            self.elements.append(ReceiptElement(
-                type=ElementType.TEXT,
-                position=(self.width // 2, y_offset),
-                content=store_display,
-                font_size=16,  # Reduced from 20
-                bold=True,
-                alignment=Alignment.CENTER,
-                element_type="store_name"
-            ))
-            y_offset += 32  # Increased spacing
-
-            # Sometimes skip address (20% chance)
-            if random.random() < 0.8:
-                # Address lines (sometimes just one line)
-                if random.random() < 0.6:
-                    for line in address:
-                        self.elements.append(ReceiptElement(
-                            type=ElementType.TEXT,
-                            position=(self.width // 2, y_offset),
-                            content=line,
-                            font_size=10,
-                            alignment=Alignment.CENTER,
-                            element_type="address"
-                        ))
-                        y_offset += 15
-                else:
-                    # Combined address on one line
-                    if len(address) > 0:
-                        combined = address[0] if len(address) == 1 else f"{address[0]}, {address[1]}"
-                        self.elements.append(ReceiptElement(
-                            type=ElementType.TEXT,
-                            position=(self.width // 2, y_offset),
-                            content=truncate_text(combined, 42),
-                            font_size=9,
-                            alignment=Alignment.CENTER,
-                            element_type="address"
-                        ))
-                        y_offset += 15
-
-            # Phone (70% chance)
-            if random.random() < 0.7:
-                self.elements.append(ReceiptElement(
-                    type=ElementType.TEXT,
-                    position=(self.width // 2, y_offset),
-                    content=phone,
-                    font_size=10,
-                    alignment=Alignment.CENTER,
-                    element_type="phone"
-                ))
-                y_offset += 20
-
-        y_offset += 5
-
-        # Separator line (80% chance)
-        if random.random() < 0.8:
-            self.elements.append(ReceiptElement(
-                type=ElementType.LINE,
-                position=(self.padding, y_offset),
-                width=self.width - 2 * self.padding
-            ))
-            y_offset += 10
-        else:
-            y_offset += 5
-
-        return y_offset
+    def _add_text(self, x: int, y: int, content: str, size: int = 11, bold: bool = False,
+                  align: Alignment = Alignment.LEFT, role: ElementRole = ElementRole.NONE):
+        self.elements.append(_text_element(x, y, content, size, bold, align, role))
+
+    def _add_line(self, y: int):
+        self.elements.append(_line_element(self.padding, y, self.width - 2 * self.padding))
+
+    def add_header(self, store_name: str, address: List[str], phone: str, rng=random):
+        """Add the store header.
+
+        ``rng`` may be any ``random.Random``-like object; callers generating
+        batches across threads should pass a distinct ``random.Random(seed)``
+        per thread instead of sharing the module-level generator.
+        """
+        choices = _draw_header_choices(rng)
+        plan, end_y = _choose_header_layout(choices, len(address))
+        self._apply_header_layout(plan, store_name, address, phone, rng)
+        return self.padding + end_y
+
+    def _apply_header_layout(self, plan: LayoutPlan, store_name: str, address: List[str], phone: str,
+                             rng=random):
+        """Stamp header content into the rows of a layout plan."""
+        pad = self.padding
+        cx = self.width // 2
+        for y, font_size, bold, alignment, element_type, (kind, index, max_chars) in plan:
+            y += pad
+
+            if kind == "line":
+                self._add_line(y)
+                continue
+
+            if kind == "store":
+                content = store_name
+            elif kind == "store_upper":
+                content = store_name.upper()
+            elif kind == "address":
+                content = address[index]
+            elif kind == "address_combined":
+                content = address[0] if len(address) == 1 else f"{address[0]}, {address[1]}"
+            elif kind == "phone":
+                content = phone
+            else:  # register
+                content = f"Store #{rng.randint(100, 999)} Reg #{rng.randint(1, 9)}"
+
+            x = pad if alignment == Alignment.LEFT else cx
+            self._add_text(x, y, _truncate_text(content, max_chars), font_size, bold, alignment, element_type)
 
     def add_items(self, items: List[Dict], start_y: int):
+        pad = self.padding
+        right_x = self.width - pad
         y_offset = start_y
 
+        new_elems = []
+        append = new_elems.append
+
         for item in items:
             # Item name
-            self.elements.append(ReceiptElement(
-                type=ElementType.TEXT,
-                position=(self.padding, y_offset),
-                content=item['name'],
-                font_size=11,
-                alignment=Alignment.LEFT,
-                element_type="item_name"
-            ))
+            append(_text_element(pad, y_offset, item['name'], 11, False, Alignment.LEFT,
+                                 ElementRole.ITEM_NAME))
 
             # Total price on the right
-            self.elements.append(ReceiptElement(
-                type=ElementType.TEXT,
-                position=(self.width - self.padding, y_offset),
-                content=f"${item['total']:.2f}",
-                font_size=11,
-                alignment=Alignment.RIGHT,
-                element_type="item_price"
-            ))
+            append(_text_element(right_x, y_offset, f"${item['total']:.2f}", 11, False, Alignment.RIGHT,
+                                 ElementRole.ITEM_PRICE))
 
             # Quantity details on next line if needed
             if item.get('quantity', 1) > 1:
                 y_offset += 15
                 qty_price = f"  {item['quantity']} x ${item['unit_price']:.2f}"
-                self.elements.append(ReceiptElement(
-                    type=ElementType.TEXT,
-                    position=(self.padding + 10, y_offset),
-                    content=qty_price,
-                    font_size=9,
-                    alignment=Alignment.LEFT
-                ))
+                append(_text_element(pad + 10, y_offset, qty_price, 9))
                 y_offset += 15
             else:
                 y_offset += 20
 
+        self.elements.extend(new_elems)
         return y_offset
 
     def add_totals(self, subtotal: float, tax: float, total: float, start_y: int):
-        y_offset = start_y
-
-        # Separator line
-        self.elements.append(ReceiptElement(
-            type=ElementType.LINE,
-            position=(self.padding, y_offset),
-            width=self.width - 2 * self.padding
-        ))
-        y_offset += 15
-
-        # Subtotal
-        self.elements.append(ReceiptElement(
-            type=ElementType.TEXT,
-            position=(self.padding, y_offset),
-            content="Subtotal:",
-            font_size=11
-        ))
-        self.elements.append(ReceiptElement(
-            type=ElementType.TEXT,
-            position=(self.width - self.padding, y_offset),
-            content=f"${subtotal:.2f}",
-            font_size=11,
-            alignment=Alignment.RIGHT
-        ))
-        y_offset += 20
-
-        # Tax
-        self.elements.append(ReceiptElement(
-            type=ElementType.TEXT,
-            position=(self.padding, y_offset),
-            content="Tax:",
-            font_size=11
-        ))
-        self.elements.append(ReceiptElement(
-            type=ElementType.TEXT,
-            position=(self.width - self.padding, y_offset),
-            content=f"${tax:.2f}",
-            font_size=11,
-            alignment=Alignment.RIGHT
-        ))
-        y_offset += 20
-
-        # Total
-        self.elements.append(ReceiptElement(
-            type=ElementType.TEXT,
-            position=(self.padding, y_offset),
-            content="TOTAL:",
-            font_size=14,
-            bold=True
-        ))
-        self.elements.append(ReceiptElement(
-            type=ElementType.TEXT,
-            position=(self.width - self.padding, y_offset),
-            content=f"${total:.2f}",
-            font_size=14,
-            bold=True,
-            alignment=Alignment.RIGHT
-        ))
-
-        return y_offset + 30
-
-    def add_footer(self, transaction_id: str, date_time: str, start_y: int):
-        import random
-        y_offset = start_y
-
-        # Randomly choose footer style
-        footer_style = random.choice(["minimal", "standard", "detailed", "compact", "spread"])
-
-        if footer_style == "minimal":
-            # Just date/time, no transaction ID or thank you
-            self.elements.append(ReceiptElement(
-                type=ElementType.TEXT,
-                position=(self.padding, y_offset),
-                content=date_time,
-                font_size=8,
-                alignment=Alignment.LEFT,
-                element_type="timestamp"
-            ))
-            return y_offset + 15
-
-        elif footer_style == "compact":
-            # Transaction ID and date on same line
-            self.elements.append(ReceiptElement(
-                type=ElementType.TEXT,
-                position=(self.padding, y_offset),
-                content=f"#{transaction_id[:8]}",
-                font_size=8,
-                alignment=Alignment.LEFT,
-                element_type="transaction"
-            ))
-            self.elements.append(ReceiptElement(
-                type=ElementType.TEXT,
-                position=(self.width - self.padding, y_offset),
-                content=date_time.split()[0],  # Just date, no time
-                font_size=8,
-                alignment=Alignment.RIGHT,
-                element_type="timestamp"
-            ))
-            return y_offset + 20
-
-        elif footer_style == "spread":
-            # Spread elements across width
-            # Date on left
-            self.elements.append(ReceiptElement(
-                type=ElementType.TEXT,
-                position=(self.padding, y_offset),
-                content=date_time,
-                font_size=9,
-                alignment=Alignment.LEFT,
-                element_type="timestamp"
-            ))
-
-            # Transaction in middle (sometimes)
-            if random.random() < 0.6:
-                self.elements.append(ReceiptElement(
-                    type=ElementType.TEXT,
-                    position=(self.width // 2, y_offset),
-                    content=f"TRN: {transaction_id[:6]}",
-                    font_size=8,
-                    alignment=Alignment.CENTER,
-                    element_type="transaction"
-                ))
-
-            y_offset += 20
-
-            # Random thank you (40% chance)
-            if random.random() < 0.4:
-                thank_you_msgs = [
-                    "Thank You",
-                    "Come Again",
-                    "Have a Great Day",
-                    "Thanks!",
-                    "Visit Again Soon"
-                ]
-                self.elements.append(ReceiptElement(
-                    type=ElementType.TEXT,
-                    position=(self.width // 2, y_offset),
-                    content=random.choice(thank_you_msgs),
-                    font_size=10,
-                    alignment=Alignment.CENTER,
-                    element_type="thank_you"
-                ))
-                y_offset += 15
-
-            return y_offset
-
-        elif footer_style == "detailed":
-            # More detailed footer with various elements
-
-            # Transaction ID (70% chance)
-            if random.random() < 0.7:
-                tx_formats = [
-                    f"Transaction: {transaction_id}",
-                    f"Trans #{transaction_id}",
-                    f"REF: {transaction_id[:10]}",
-                    f"{transaction_id}"
-                ]
-                self.elements.append(ReceiptElement(
-                    type=ElementType.TEXT,
-                    position=(self.width // 2, y_offset),
-                    content=random.choice(tx_formats),
-                    font_size=9,
-                    alignment=Alignment.CENTER,
-                    element_type="transaction"
-                ))
-                y_offset += 15
-
-            # Date/time (different formats)
-            date_formats = [
-                date_time,
-                date_time.split()[0] + " " + date_time.split()[1],
-                date_time.replace(" ", "  "),
-            ]
-            self.elements.append(ReceiptElement(
-                type=ElementType.TEXT,
-                position=(self.width // 2, y_offset),
-                content=random.choice(date_formats),
-                font_size=9,
-                alignment=Alignment.CENTER,
-                element_type="timestamp"
-            ))
-            y_offset += 20
-
-            # Additional elements (randomly included)
-            if random.random() < 0.3:
-                # Cashier info
-                self.elements.append(ReceiptElement(
-                    type=ElementType.TEXT,
-                    position=(self.padding, y_offset),
-                    content=f"Cashier: {random.choice(['JOHN', 'MARY', 'ALEX', 'SAM', '#042'])}",
-                    font_size=8,
-                    alignment=Alignment.LEFT
-                ))
-                y_offset += 15
-
-            if random.random() < 0.5:
-                # Thank you message
-                thank_you_msgs = [
-                    "Thank you for your purchase!",
-                    "Thanks for shopping with us",
-                    "We appreciate your business",
-                    "Thank You!",
-                    "Have a nice day!"
-                ]
-                self.elements.append(ReceiptElement(
-                    type=ElementType.TEXT,
-                    position=(self.width // 2, y_offset),
-                    content=random.choice(thank_you_msgs),
-                    font_size=11,
-                    alignment=Alignment.CENTER,
-                    element_type="thank_you"
-                ))
-                y_offset += 20
-
-            return y_offset
-
-        else:  # standard
-            # Traditional receipt footer
-
-            # Sometimes no transaction ID (30% chance)
-            if random.random() < 0.7:
-                self.elements.append(ReceiptElement(
-                    type=ElementType.TEXT,
-                    position=(self.width // 2, y_offset),
-                    content=f"Transaction: {transaction_id}",
-                    font_size=9,
-                    alignment=Alignment.CENTER,
-                    element_type="transaction"
-                ))
-                y_offset += 15
-
-            self.elements.append(ReceiptElement(
-                type=ElementType.TEXT,
-                position=(self.width // 2, y_offset),
-                content=date_time,
-                font_size=9,
-                alignment=Alignment.CENTER,
-                element_type="timestamp"
-            ))
-            y_offset += 20
-
-            # Thank you message (60% chance)
-            if random.random() < 0.6:
-                self.elements.append(ReceiptElement(
-                    type=ElementType.TEXT,
-                    position=(self.width // 2, y_offset),
-                    content="Thank you for your purchase!",
-                    font_size=11,
-                    alignment=Alignment.CENTER,
-                    element_type="thank_you"
-                ))
-                y_offset += 20
-
-            return y_offset
-
-    def add_promotional_text(self, start_y: int) -> int:
-        """Add random promotional/marketing text at the bottom of receipts (50% chance)"""
-        import random
-        import string
+        pad = self.padding
+        right_x = self.width - pad
+        subtotal_y = start_y + 15
+        tax_y = subtotal_y + 20
+        total_y = tax_y + 20
+
+        self.elements.extend([
+            # Separator line
+            _line_element(pad, start_y, self.width - 2 * pad),
+            # Subtotal
+            _PROTO_SUBTOTAL._replace(position=(pad, subtotal_y)),
+            _PROTO_AMOUNT._replace(position=(right_x, subtotal_y), content=f"${subtotal:.2f}"),
+            # Tax
+            _PROTO_TAX._replace(position=(pad, tax_y)),
+            _PROTO_AMOUNT._replace(position=(right_x, tax_y), content=f"${tax:.2f}"),
+            # Total
+            _PROTO_TOTAL._replace(position=(pad, total_y)),
+            _PROTO_TOTAL_AMOUNT._replace(position=(right_x, total_y), content=f"${total:.2f}"),
+        ])
+
+        return total_y + 30
+
+    def add_footer(self, transaction_id: str, date_time: str, start_y: int, rng=random):
+        """Add the transaction/timestamp footer. See add_header for ``rng``."""
+        # Draw the style and every inclusion flag in one batch
+        _rand, _choice = rng.random, rng.choice
+        r = [_rand() for _ in range(4)]
+        build = _FOOTER_BUILDERS[int(r[0] * len(_FOOTER_BUILDERS))]
+        return build(self, transaction_id, date_time, start_y, r, _choice)
+
+    def add_promotional_text(self, start_y: int, rng=random) -> int:
+        """Add random promotional/marketing text at the bottom of receipts (50% chance).
+
+        See add_header for ``rng``.
+        """
+        cx = self.width // 2
+        _rand, _randint, _choice = rng.random, rng.randint, rng.choice
 
         # Add promotional text 50% of the time (increased from 30%)
-        if random.random() > 0.5:
+        if _rand() > 0.5:
             return start_y
 
         y_offset = start_y + 10  # Add some spacing first
 
         # Different types of promotional content
-        promo_type = random.choice(["website", "survey", "rewards", "random_text", "coupon"])
-
-        if promo_type == "website":
-            # Website promotion
-            lines = [
-                "Visit us online at",
-                f"www.{''.join(random.choices(string.ascii_lowercase, k=8))}.com",
-                "for exclusive deals and offers!"
-            ]
-        elif promo_type == "survey":
-            # Survey invitation
-            lines = [
-                "Tell us about your experience!",
-                f"Survey Code: {random.randint(1000, 9999)}-{random.randint(100, 999)}",
-                "Complete online for a chance to win!"
-            ]
-        elif promo_type == "rewards":
-            # Rewards program
-            lines = [
-                "Join our rewards program!",
-                f"You could have earned {random.randint(10, 100)} points",
-                "Sign up at customer service"
-            ]
-        elif promo_type == "coupon":
-            # Coupon/discount
-            lines = [
-                f"Save {random.choice([10, 15, 20, 25])}% on your next visit!",
-                f"Coupon code: {''.join(random.choices(string.ascii_uppercase + string.digits, k=6))}",
-                f"Valid until {random.randint(1, 12)}/{random.randint(1, 28)}/{random.randint(24, 25)}"
-            ]
-        else:  # random_text
-            # Generate random paragraph-like text (gibberish for training)
-            # This helps the model learn to ignore non-essential text
-            num_lines = random.randint(3, 6)  # Increased from 2-4 to 3-6 lines
-            lines = []
-            for _ in range(num_lines):
-                # Generate random "words" of varying lengths
-                num_words = random.randint(6, 12)  # Increased from 4-10 words
-                words = []
-                for _ in range(num_words):
-                    word_length = random.randint(2, 10)  # Slightly longer words
-                    word = ''.join(random.choices(string.ascii_lowercase, k=word_length))
-                    words.append(word)
-                line = ' '.join(words)
-                # Capitalize first letter and maybe add punctuation
-                line = line[0].upper() + line[1:]
-                if random.random() < 0.4:  # Slightly more punctuation
-                    line += random.choice(['.', '!', '?', '...'])
-                lines.append(line)
+        promo_type = _choice(PROMO_TYPES)
 
         # Add separator line sometimes (50% chance)
-        if random.random() < 0.5:
-            self.elements.append(ReceiptElement(
-                type=ElementType.LINE,
-                position=(self.padding, y_offset),
-                width=self.width - 2 * self.padding
-            ))
+        if _rand() < 0.5:
+            self._add_line(y_offset)
             y_offset += 10
 
         # Add the promotional text lines
-        for line in lines:
+        for line in _promo_lines(promo_type, rng):
             # Truncate if too long
             if len(line) > 45:
                 line = line[:42] + "..."
 
-            self.elements.append(ReceiptElement(
-                type=ElementType.TEXT,
-                position=(self.width // 2, y_offset),
-                content=line,
-                font_size=random.choice([7, 8, 9]),
-                alignment=Alignment.CENTER,
-                element_type="promotional"
-            ))
-            y_offset += random.randint(12, 15)
+            self._add_text(cx, y_offset, line, _choice(_PROMO_FONT_SIZES), False, Alignment.CENTER,
+                           ElementRole.PROMOTIONAL)
+            y_offset += _randint(12, 15)
 
         return y_offset + 10
 
     def to_dict(self) -> Dict:
+        # Only fields that differ from the from_dict defaults are written out
+        elements = []
+        for etype, position, content, font_size, bold, alignment, _width, role in self.elements:
+            elem = {'type': _ET2V[etype], 'position': position}
+            if content:
+                elem['content'] = content
+            if font_size != 12:
+                elem['font_size'] = font_size
+            if bold:
+                elem['bold'] = bold
+            if alignment is not Alignment.LEFT:
+                elem['alignment'] = _AL2V[alignment]
+            if role is not ElementRole.NONE:
+                elem['element_type'] = _RL2V[role]
+            elements.append(elem)
+
         return {
             'name': self.name,
             'width': self.width,
             'height': self.height,
-            'elements': [
-                {
-                    'type': elem.type.value,
-                    'position': elem.position,
-                    'content': elem.content,
-                    'font_size': elem.font_size,
-                    'bold': elem.bold,
-                    'alignment': elem.alignment.value
-                } for elem in self.elements
-            ]
+            'elements': elements
         }
 
     @classmethod
@@ -622,18 +471,131 @@ class ReceiptTemplate:
         )
 
         for elem_data in data.get('elements', []):
+            get = elem_data.get
             template.elements.append(ReceiptElement(
-                type=ElementType(elem_data['type']),
-                position=tuple(elem_data['position']),
-                content=elem_data.get('content', ''),
-                font_size=elem_data.get('font_size', 12),
-                bold=elem_data.get('bold', False),
-                alignment=Alignment(elem_data.get('alignment', 'left'))
+                _ETYPE_MAP[elem_data['type']],
+                tuple(elem_data['position']),
+                get('content', ''),
+                get('font_size', 12),
+                get('bold', False),
+                _ALIGN_MAP[get('alignment', 'left')],
+                None,
+                _ROLE_MAP[get('element_type', 0)]
             ))
 
         return template
 
 
+def _minimal_footer(template: "ReceiptTemplate", transaction_id: str, date_time: str, y_offset: int,
+                    r: List[float], _choice) -> int:
+    """Date/time only."""
+    pad = template.padding
+    # Just date/time, no transaction ID or thank you
+    template._add_text(pad, y_offset, date_time, 8, False, Alignment.LEFT, ElementRole.TIMESTAMP)
+    return y_offset + 15
+
+
+def _standard_footer(template: "ReceiptTemplate", transaction_id: str, date_time: str, y_offset: int,
+                     r: List[float], _choice) -> int:
+    """Traditional centered transaction/date/thank-you footer."""
+    cx = template.width // 2
+    # Traditional receipt footer
+    # Sometimes no transaction ID (30% chance)
+    if r[1] < 0.7:
+        template._add_text(cx, y_offset, f"Transaction: {transaction_id}", 9, False, Alignment.CENTER,
+                           ElementRole.TRANSACTION)
+        y_offset += 15
+
+    template._add_text(cx, y_offset, date_time, 9, False, Alignment.CENTER, ElementRole.TIMESTAMP)
+    y_offset += 20
+
+    # Thank you message (60% chance)
+    if r[2] < 0.6:
+        template._add_text(cx, y_offset, "Thank you for your purchase!", 11, False, Alignment.CENTER,
+                           ElementRole.THANK_YOU)
+        y_offset += 20
+
+    return y_offset
+
+
+def _detailed_footer(template: "ReceiptTemplate", transaction_id: str, date_time: str, y_offset: int,
+                     r: List[float], _choice) -> int:
+    """Transaction, reformatted date, cashier and thank-you lines."""
+    pad = template.padding
+    cx = template.width // 2
+    # More detailed footer with various elements
+    # Transaction ID (70% chance)
+    if r[1] < 0.7:
+        tx_line = _choice(_TX_FORMATS_FMT).format(transaction_id)
+        template._add_text(cx, y_offset, tx_line, 9, False, Alignment.CENTER, ElementRole.TRANSACTION)
+        y_offset += 15
+
+    # Date/time (different formats)
+    date_formats = [
+        date_time,
+        date_time.split()[0] + " " + date_time.split()[1],
+        date_time.replace(" ", "  "),
+    ]
+    template._add_text(cx, y_offset, _choice(date_formats), 9, False, Alignment.CENTER, ElementRole.TIMESTAMP)
+    y_offset += 20
+
+    # Additional elements (randomly included)
+    if r[2] < 0.3:
+        # Cashier info
+        template._add_text(pad, y_offset, f"Cashier: {_choice(_CASHIERS)}", 8)
+        y_offset += 15
+
+    if r[3] < 0.5:
+        # Thank you message
+        template._add_text(cx, y_offset, _choice(_THANK_YOU_LONG), 11, False, Alignment.CENTER,
+                           ElementRole.THANK_YOU)
+        y_offset += 20
+
+    return y_offset
+
+
+def _compact_footer(template: "ReceiptTemplate", transaction_id: str, date_time: str, y_offset: int,
+                    r: List[float], _choice) -> int:
+    """Transaction ID and date on one line."""
+    pad = template.padding
+    right_x = template.width - template.padding
+    # Transaction ID and date on same line
+    template._add_text(pad, y_offset, f"#{transaction_id[:8]}", 8, False, Alignment.LEFT,
+                       ElementRole.TRANSACTION)
+    template._add_text(right_x, y_offset, date_time.split()[0], 8, False, Alignment.RIGHT,
+                       ElementRole.TIMESTAMP)
+    return y_offset + 20
+
+
+def _spread_footer(template: "ReceiptTemplate", transaction_id: str, date_time: str, y_offset: int,
+                   r: List[float], _choice) -> int:
+    """Date, transaction and thank-you spread across the width."""
+    pad = template.padding
+    cx = template.width // 2
+    # Spread elements across width
+    # Date on left
+    template._add_text(pad, y_offset, date_time, 9, False, Alignment.LEFT, ElementRole.TIMESTAMP)
+
+    # Transaction in middle (sometimes)
+    if r[1] < 0.6:
+        template._add_text(cx, y_offset, f"TRN: {transaction_id[:6]}", 8, False, Alignment.CENTER,
+                           ElementRole.TRANSACTION)
+
+    y_offset += 20
+
+    # Random thank you (40% chance)
+    if r[2] < 0.4:
+        template._add_text(cx, y_offset, _choice(_THANK_YOU_SHORT), 10, False, Alignment.CENTER,
+                           ElementRole.THANK_YOU)
+        y_offset += 15
+
+    return y_offset
+
+
+# Footer builders, picked uniformly by add_footer
+_FOOTER_BUILDERS = (_minimal_footer, _standard_footer, _detailed_footer, _compact_footer, _spread_footer)
+
+
 class TemplateLibrary:
     @staticmethod
     def grocery_store() -> ReceiptTemplate:
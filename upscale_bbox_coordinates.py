@@ -1,49 +1,89 @@
 import json
-import cv2
+import os
+import shutil
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, Optional, Tuple
+from PIL import Image
 
+try:
+    import orjson
+except ImportError:  # fall back to the stdlib json module
+    orjson = None
 
-def upscale_bboxes_for_image(image_path: Path, bbox_data: Dict, target_width: int = 2000) -> Dict:
-    img = cv2.imread(str(image_path))
-    if img is None:
-        raise ValueError(f"Could not load image: {image_path}")
+
+def read_image_width(image_path: Path) -> Optional[int]:
+    # PIL only parses the header here, no pixels are decoded
+    try:
+        with Image.open(image_path) as im:
+            return im.size[0]
+    except OSError:
+        return None
+
+
+def upscale_bboxes_for_image(image_path: Path, bbox_data: Dict, target_width: int = 2000,
+                             original_width: Optional[int] = None, in_place: bool = True) -> Tuple[Dict, bool]:
+    """Return ``(bbox_data, changed)``; ``changed`` is False when no upscale was needed.
+
+    With ``in_place`` (the default) the boxes in ``bbox_data`` are updated
+    directly; pass ``in_place=False`` to leave the input untouched.
+    """
+    if original_width is None:
+        original_width = read_image_width(image_path)
+        if original_width is None:
+            raise ValueError(f"Could not load image: {image_path}")
     
-    original_width = img.shape[1]
     upscale_factor = target_width / original_width if original_width < target_width else 1.0
     
     if upscale_factor == 1.0:
-        return bbox_data
-    
-    upscaled_results = []
-    for box in bbox_data.get("results", []):
-        upscaled_bbox = [
-            [point[0] * upscale_factor, point[1] * upscale_factor]
-            for point in box["bbox"]
-        ]
-        upscaled_box = box.copy()
-        upscaled_box["bbox"] = upscaled_bbox
-        upscaled_results.append(upscaled_box)
-    
-    return {"results": upscaled_results}
+        return bbox_data, False
+    
+    results = bbox_data.get("results", [])
+    if not results:
+        return bbox_data, False
+
+    # Scale every corner of every box in a single (N, K, 2) array multiply
+    coords = np.asarray([box["bbox"] for box in results], dtype=np.float64) * upscale_factor
+
+    if in_place:
+        for box, upscaled_bbox in zip(results, coords.tolist()):
+            box["bbox"] = upscaled_bbox
+        return {"results": results}, True
+    
+    upscaled_results = [{**box, "bbox": upscaled_bbox} for box, upscaled_bbox in zip(results, coords.tolist())]
+    return {"results": upscaled_results}, True
 
 
 def upscale_bbox_file(bbox_path: Path, image_path: Path, output_path: Optional[Path] = None, 
-                      target_width: int = 2000) -> Dict:
-    with open(bbox_path, 'r') as f:
-        bbox_data = json.load(f)
+                      target_width: int = 2000, original_width: Optional[int] = None) -> Dict:
+    if orjson is not None:
+        with open(bbox_path, 'rb') as f:
+            bbox_data = orjson.loads(f.read())
+    else:
+        with open(bbox_path, 'r') as f:
+            bbox_data = json.load(f)
     
-    upscaled_data = upscale_bboxes_for_image(image_path, bbox_data, target_width)
+    upscaled_data, changed = upscale_bboxes_for_image(image_path, bbox_data, target_width, original_width)
     
     output = output_path if output_path else bbox_path
-    with open(output, 'w') as f:
-        json.dump(upscaled_data, f, indent=2)
+    if changed:
+        if orjson is not None:
+            payload = orjson.dumps(upscaled_data, option=orjson.OPT_INDENT_2)
+        else:
+            # indent= forces the pure-Python encoder; compact output keeps the C one
+            payload = json.dumps(upscaled_data, separators=(',', ':')).encode()
+        with open(output, 'wb') as f:
+            f.write(payload)
+    elif Path(output) != Path(bbox_path):
+        # Nothing to rescale: copy the bytes instead of re-serializing
+        shutil.copyfile(bbox_path, output)
     
     return upscaled_data
 
 
 def upscale_all_bboxes(bbox_dir: Path, images_dir: Path, output_dir: Optional[Path] = None,
-                      target_width: int = 2000):
+                      target_width: int = 2000, max_workers: Optional[int] = None):
     bbox_dir = Path(bbox_dir)
     images_dir = Path(images_dir)
     
@@ -51,21 +91,48 @@ def upscale_all_bboxes(bbox_dir: Path, images_dir: Path, output_dir: Optional[Pa
         output_dir = Path(output_dir)
         output_dir.mkdir(exist_ok=True, parents=True)
     
-    json_files = list(bbox_dir.glob("*.json"))
+    # One directory listing instead of an exists() stat per bbox file
+    available_ids = {p.stem for p in images_dir.glob("*.png")}
+    json_files = [p for p in bbox_dir.glob("*.json") if p.stem in available_ids]
+    
+    # Existing outputs are only reusable if they were written for this target width.
+    # The stamp is dropped before recomputing and rewritten once the run completes.
+    stamp_path = output_dir / ".upscaled_to" if output_dir else None
+    reuse_outputs = False
+    if stamp_path is not None:
+        try:
+            reuse_outputs = int(stamp_path.read_text()) == target_width
+        except (FileNotFoundError, ValueError):
+            pass
+        if not reuse_outputs:
+            stamp_path.unlink(missing_ok=True)
     
-    for bbox_path in json_files:
-        receipt_id = bbox_path.stem
-        image_path = images_dir / f"{receipt_id}.png"
+    def process_one(bbox_path: Path):
+        image_path = images_dir / f"{bbox_path.stem}.png"
         
-        if not image_path.exists():
-            continue
+        output_path = output_dir / bbox_path.name if output_dir else None
         
-        img = cv2.imread(str(image_path))
-        if img is None:
-            continue
+        # Skip outputs that are already newer than both of their inputs
+        if reuse_outputs:
+            try:
+                output_mtime = output_path.stat().st_mtime
+            except FileNotFoundError:
+                output_mtime = None
+            if output_mtime is not None and output_mtime > max(bbox_path.stat().st_mtime, image_path.stat().st_mtime):
+                return
         
-        output_path = output_dir / bbox_path.name if output_dir else None
-        upscale_bbox_file(bbox_path, image_path, output_path, target_width)
+        original_width = read_image_width(image_path)
+        if original_width is None:
+            return
+        
+        upscale_bbox_file(bbox_path, image_path, output_path, target_width, original_width)
+    
+    # Files are independent and the work is JSON + file I/O, so threads are enough
+    with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+        list(executor.map(process_one, json_files))
+    
+    if stamp_path is not None:
+        stamp_path.write_text(str(target_width))
     
     print(f"✓ Processed {len(json_files)} bbox files")
 
@@ -3,14 +3,180 @@
 Visualize bounding boxes on receipt images using CV2 style.
 """
 
+import heapq
 import json
+import logging
+import logging.handlers
+import mmap
+import multiprocessing
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 import cv2
 import numpy as np
 
+try:
+    import orjson
+except ImportError:  # fall back to the stdlib json module
+    orjson = None
 
-def visualize_receipt(receipt_id: str, data_dir: str = "./data/synthetic", bbox_dir: str = None, output_path: str = None):
-    """Draw bounding boxes on a receipt image using CV2 style."""
+log = logging.getLogger(__name__)
+
+# Scripts importing this module (demo.py, regenerate_samples.py) expect the status
+# lines on stdout as before, so plain messages go there unless configure_logging()
+# swaps in the queue handler
+_default_handler = logging.StreamHandler(sys.stdout)
+_default_handler.setFormatter(logging.Formatter("%(message)s"))
+log.addHandler(_default_handler)
+log.setLevel(logging.INFO)
+log.propagate = False
+
+# Queue behind configure_logging(), shared with batch worker processes
+_log_queue = None
+
+
+def configure_logging(level: int = logging.INFO) -> logging.handlers.QueueListener:
+    """Route this module's messages to stdout through a queue drained by a background thread.
+
+    Workers only enqueue records, so status output never blocks drawing. Returns
+    the started listener; call ``stop()`` on it to flush before exiting.
+    """
+    global _log_queue
+    _log_queue = multiprocessing.Queue(-1)
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    listener = logging.handlers.QueueListener(_log_queue, handler)
+    _init_worker_logging(_log_queue, level)
+    listener.start()
+    return listener
+
+
+def _init_worker_logging(log_queue, level: int = logging.INFO):
+    if log_queue is None:
+        return
+    log.handlers[:] = [logging.handlers.QueueHandler(log_queue)]
+    log.setLevel(level)
+    log.propagate = False
+
+
+# Visualizations are throwaway artifacts: favour encode speed over file size
+PNG_WRITE_PARAMS = [cv2.IMWRITE_PNG_COMPRESSION, 1]
+JPEG_WRITE_PARAMS = [cv2.IMWRITE_JPEG_QUALITY, 85]
+
+# Box label style; red text in BGR. The glyph extents above/below the baseline
+# tell which labels would land entirely outside the image.
+LABEL_FONT = cv2.FONT_HERSHEY_SIMPLEX
+LABEL_SCALE = 0.5
+LABEL_COLOR = (0, 0, 255)
+LABEL_THICKNESS = 1
+(_, LABEL_ASCENT), LABEL_DESCENT = cv2.getTextSize("Ag", LABEL_FONT, LABEL_SCALE, LABEL_THICKNESS)
+
+# Below this many boxes the NumPy path is already as fast as the kernel. Real
+# receipts stay far below it, so Numba is only imported once a page crosses it.
+NUMBA_MIN_BOXES = 1024
+
+
+@lru_cache(maxsize=1)
+def _aabb_kernel():
+    """Compile (once) and return the Numba extents kernel, or None without Numba."""
+    try:
+        from numba import njit
+    except ImportError:  # plain NumPy reductions are used instead
+        return None
+
+    @njit(cache=True, boundscheck=False)
+    def kernel(corners, out):
+        for i in range(corners.shape[0]):
+            x0 = x1 = corners[i, 0, 0]
+            y0 = y1 = corners[i, 0, 1]
+            for k in range(1, corners.shape[1]):
+                x = corners[i, k, 0]
+                y = corners[i, k, 1]
+                if x < x0:
+                    x0 = x
+                elif x > x1:
+                    x1 = x
+                if y < y0:
+                    y0 = y
+                elif y > y1:
+                    y1 = y
+            out[i, 0] = x0
+            out[i, 1] = y0
+            out[i, 2] = x1
+            out[i, 3] = y1
+
+    return kernel
+
+
+def box_extents(corners: np.ndarray):
+    """Truncated (mins, maxs) int32 (N, 2) corners of an (N, K, 2) quad array."""
+    kernel = _aabb_kernel() if corners.shape[0] >= NUMBA_MIN_BOXES else None
+    if kernel is None:
+        if corners.shape[1] != 4:
+            return corners.min(axis=1).astype(np.int32), corners.max(axis=1).astype(np.int32)
+        # Pairwise elementwise min/max over the four corners; several times faster
+        # than NumPy's reduction along a length-4 axis
+        p0, p1, p2, p3 = corners[:, 0], corners[:, 1], corners[:, 2], corners[:, 3]
+        mins = np.minimum(np.minimum(p0, p1), np.minimum(p2, p3))
+        maxs = np.maximum(np.maximum(p0, p1), np.maximum(p2, p3))
+        return mins.astype(np.int32), maxs.astype(np.int32)
+    out = np.empty((corners.shape[0], 4), dtype=np.int32)
+    kernel(np.ascontiguousarray(corners, dtype=np.float64), out)
+    return out[:, :2], out[:, 2:]
+
+
+# Decoded images and parsed boxes for repeated single-receipt calls, keyed by
+# (path, mtime_ns) so edits invalidate them. Callers must not mutate the cached
+# objects; draw on a copy of the image. Batch mode reads each receipt once and
+# bypasses these.
+@lru_cache(maxsize=32)
+def _load_image(path: str, mtime_ns: int):
+    return _read_image(path)
+
+
+def _read_image(path: str):
+    # Decode straight from a read-only mapping instead of reading into a heap buffer
+    with open(path, 'rb') as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file
+            return None
+    with mm:
+        return cv2.imdecode(np.frombuffer(mm, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+
+@lru_cache(maxsize=32)
+def _load_bboxes(path: str, mtime_ns: int):
+    return _read_bboxes(path)
+
+
+def _read_bboxes(path: str):
+    with open(path, 'rb') as f:
+        raw = f.read()
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+
+def _preload_bboxes(paths: list, max_workers: int = 8) -> list:
+    """Read and parse many small bbox files concurrently; missing files come back as None."""
+    def read(path):
+        try:
+            return _read_bboxes(path)
+        except FileNotFoundError:
+            return None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(read, paths))
+
+
+def visualize_receipt(receipt_id: str, data_dir: str = "./data/synthetic", bbox_dir: str = None, output_path: str = None,
+                      bbox_data: dict = None):
+    """Draw bounding boxes on a receipt image using CV2 style.
+
+    Already-parsed boxes can be passed as ``bbox_data`` to skip reading the JSON.
+    """
 
     data_dir = Path(data_dir)
     
@@ -20,52 +186,31 @@ def visualize_receipt(receipt_id: str, data_dir: str = "./data/synthetic", bbox_
     else:
         bbox_dir = data_dir / "bboxes"
 
-    # Load image
     img_path = data_dir / "images" / f"{receipt_id}.png"
-    if not img_path.exists():
-        print(f"Image not found: {img_path}")
-        return None
-
-    # Read image with CV2
-    img = cv2.imread(str(img_path))
-    if img is None:
-        print(f"Failed to load image: {img_path}")
-        return None
-
-    # Load bounding boxes
     bbox_path = bbox_dir / f"{receipt_id}.json"
-    if not bbox_path.exists():
-        print(f"Bounding boxes not found: {bbox_path}")
-        return None
+    return _visualize_receipt_impl(str(img_path), str(bbox_path), str(output_path) if output_path else None,
+                                   bbox_data)
 
-    with open(bbox_path, 'r') as f:
-        bbox_data = json.load(f)
 
-    # Draw each bounding box
-    for box in bbox_data["results"]:
-        bbox = box["bbox"]
-        text = box["text"]
+def _visualize_receipt_impl(img_path: str, bbox_path: str, output_path: str = None, bbox_data: dict = None,
+                            cached: bool = True):
+    """visualize_receipt on already-resolved path strings. See _load_receipt for ``cached``."""
 
-        # Convert 4 corner points to rectangle
-        # Find min/max coordinates
-        xs = [p[0] for p in bbox]
-        ys = [p[1] for p in bbox]
-        x1, y1 = int(min(xs)), int(min(ys))
-        x2, y2 = int(max(xs)), int(max(ys))
+    loaded = _load_receipt(img_path, bbox_path, bbox_data, cached)
+    if loaded is None:
+        return None
+    img, bbox_data = loaded
 
-        # Draw green rectangle (BGR format in CV2)
-        cv2.rectangle(img, (x1, y1), (x2, y2), (0, 255, 0), 2)  # Green color, thickness 2
+    # Drawing mutates the image, so a cached decode is copied first
+    if cached:
+        img = img.copy()
 
-        # Add text label above the box - let it go off-screen if needed
-        # OpenCV will still render the visible portion
-        text_y = y1 - 5  # Small padding above the box
-        cv2.putText(img, text[:20], (x1, text_y),  # Truncate long text
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 1, cv2.LINE_AA)  # Red text (BGR format)
+    _draw_boxes(img, bbox_data["results"])
 
     # Save or display
     if output_path:
-        cv2.imwrite(str(output_path), img)
-        print(f"Saved visualization to: {output_path}")
+        if not _save_visualization(img, output_path):
+            return None
     else:
         cv2.imshow("Receipt with Bounding Boxes", img)
         cv2.waitKey(0)
@@ -74,28 +219,178 @@ def visualize_receipt(receipt_id: str, data_dir: str = "./data/synthetic", bbox_
     return img
 
 
-def visualize_batch(data_dir: str = "./data/synthetic", bbox_dir: str = None, count: int = 5):
-    """Visualize multiple receipts."""
+def _load_receipt(img_path: str, bbox_path: str, bbox_data: dict = None, cached: bool = True):
+    """Return ``(image, bbox_data)`` for a receipt, or None (with a message) if either is missing.
+
+    A given ``bbox_data`` is used as-is instead of reading ``bbox_path``. With
+    ``cached`` the shared read-only cache entries are returned; otherwise the
+    files are read fresh and the image may be drawn on directly.
+    """
+
+    # Load image
+    try:
+        img = _load_image(img_path, os.stat(img_path).st_mtime_ns) if cached else _read_image(img_path)
+    except FileNotFoundError:
+        log.warning(f"Image not found: {img_path}")
+        return None
+
+    # Read image with CV2
+    if img is None:
+        log.error(f"Failed to load image: {img_path}")
+        return None
+
+    # Load bounding boxes
+    if bbox_data is None:
+        try:
+            bbox_data = _load_bboxes(bbox_path, os.stat(bbox_path).st_mtime_ns) if cached else _read_bboxes(bbox_path)
+        except FileNotFoundError:
+            log.warning(f"Bounding boxes not found: {bbox_path}")
+            return None
+
+    return img, bbox_data
+
+
+def _draw_boxes(img: np.ndarray, results: list):
+    """Draw every box outline and its label into ``img`` in place."""
+    if not results:
+        return
+
+    # Min/max corners of every box in one vectorized pass
+    corners = np.asarray([box["bbox"] for box in results], dtype=np.float64)
+    mins, maxs = box_extents(corners)
+
+    # Degenerate (zero-area) boxes are OCR noise: no outline, no label
+    keep = np.flatnonzero((maxs[:, 0] > mins[:, 0]) & (maxs[:, 1] > mins[:, 1]))
+    if keep.size < len(results):
+        mins, maxs = mins[keep], maxs[keep]
+        results = [results[i] for i in keep.tolist()]
+    x1, y1 = mins[:, 0], mins[:, 1]
+    x2, y2 = maxs[:, 0], maxs[:, 1]
+
+    # Outlines: skip boxes wholly off the canvas (the 2px line reaches 1px past the
+    # corners) and draw identical boxes once. Their labels are culled separately below.
+    height, width = img.shape[:2]
+    on_canvas = (x2 >= -1) & (y2 >= -1) & (x1 <= width) & (y1 <= height)
+    extents = np.unique(np.concatenate([mins, maxs], axis=1)[on_canvas], axis=0)
+    bx1, by1, bx2, by2 = extents.T
+
+    # Draw every green rectangle (BGR format in CV2) in a single call
+    rects = np.stack([bx1, by1, bx2, by1, bx2, by2, bx1, by2], axis=1).reshape(-1, 4, 1, 2)
+    if len(rects):
+        cv2.polylines(img, list(rects), True, (0, 255, 0), 2)  # Green color, thickness 2
+
+    # Add text label above each box - let it go off-screen if needed
+    # OpenCV renders the visible portion; labels with nothing visible are skipped
+    text_ys = y1 - 5  # Small padding above the box
+    visible = ((text_ys + LABEL_DESCENT + LABEL_THICKNESS > 0)
+               & (text_ys - LABEL_ASCENT - LABEL_THICKNESS < height)
+               & (x1 < width))
+    xs, ys = x1.tolist(), text_ys.tolist()
+    font, scale, color, thickness, line_type = LABEL_FONT, LABEL_SCALE, LABEL_COLOR, LABEL_THICKNESS, cv2.LINE_AA
+    for i in np.flatnonzero(visible).tolist():
+        cv2.putText(img, results[i]["text"][:20], (xs[i], ys[i]),  # Truncate long text
+                    font, scale, color, thickness, line_type)
+
+
+def _save_visualization(img: np.ndarray, output_path: str) -> bool:
+    ext = os.path.splitext(output_path)[1].lower()
+    # Encode in memory and write the buffer in one go
+    ok, buf = cv2.imencode(ext, img, JPEG_WRITE_PARAMS if ext in (".jpg", ".jpeg") else PNG_WRITE_PARAMS)
+    if not ok:
+        log.error(f"Failed to encode visualization: {output_path}")
+        return False
+    with open(output_path, 'wb') as f:
+        f.write(buf)
+    log.info(f"Saved visualization to: {output_path}")
+    return True
+
+
+def _viz_one(args):
+    """Process-pool entry point: ``args`` is ``(img_path, bbox_path, output_path, bbox_data)``."""
+    img_path, bbox_path, output_path, bbox_data = args
+    _visualize_receipt_impl(img_path, bbox_path, output_path, bbox_data, cached=False)
+
+
+def _visualize_pipelined(jobs: list, depth: int = 4):
+    """Run batch jobs in one process as a decode -> draw -> encode pipeline.
+
+    Decoding and encoding each get a single-thread executor (OpenCV releases the
+    GIL inside both), so the next receipts are read and the previous ones written
+    while this one is drawn. At most ``depth`` receipts are in flight on either
+    side, and an exception from any stage propagates to the caller.
+    """
+    with ThreadPoolExecutor(max_workers=1) as decoder, ThreadPoolExecutor(max_workers=1) as encoder:
+        def submit_decode(job):
+            img_path, bbox_path, _, bbox_data = job
+            return decoder.submit(_load_receipt, img_path, bbox_path, bbox_data, False)
+
+        decodes = deque(submit_decode(job) for job in jobs[:depth])
+        encodes = deque()
+        for n, (_, _, output_path, _) in enumerate(jobs):
+            loaded = decodes.popleft().result()
+            if n + depth < len(jobs):
+                decodes.append(submit_decode(jobs[n + depth]))
+            if loaded is None:
+                continue
+            img, bbox_data = loaded
+            _draw_boxes(img, bbox_data["results"])
+            encodes.append(encoder.submit(_save_visualization, img, output_path))
+            if len(encodes) > depth:
+                encodes.popleft().result()
+        for future in encodes:
+            future.result()
+
+
+def visualize_batch(data_dir: str = "./data/synthetic", bbox_dir: str = None, count: int = 5,
+                    workers: int = None, fmt: str = "png"):
+    """Visualize multiple receipts, spread over ``workers`` processes (default: one per CPU).
+
+    With a single worker, the receipts are pipelined on threads instead.
+    ``fmt`` is the output image format, ``"png"`` or ``"jpg"``.
+    """
 
     data_dir = Path(data_dir)
     output_dir = data_dir / "visualizations"
     output_dir.mkdir(exist_ok=True)
 
-    # Find available receipts
-    images = sorted((data_dir / "images").glob("*.png"))[:count]
+    # Find available receipts: the first `count` by name, without sorting the whole listing
+    try:
+        with os.scandir(data_dir / "images") as it:
+            names = [e.name for e in it if e.name.endswith(".png")]
+    except FileNotFoundError:
+        names = []
+    images = heapq.nsmallest(count, names)
 
     if not images:
-        print("No receipts found to visualize")
+        log.warning("No receipts found to visualize")
         return
 
-    print(f"Visualizing {len(images)} receipts...")
+    log.info(f"Visualizing {len(images)} receipts...")
 
-    for img_path in images:
-        receipt_id = img_path.stem
-        output_path = output_dir / f"viz_{receipt_id}.png"
-        visualize_receipt(receipt_id, data_dir, bbox_dir, output_path)
+    # Resolve the directories once; per-receipt paths are plain string joins
+    img_dir_str = str(data_dir / "images")
+    bbox_dir_str = str(Path(bbox_dir) if bbox_dir is not None else data_dir / "bboxes")
+    out_dir_str = str(output_dir)
+    stems = [name[:-4] for name in images]
+    bbox_paths = [bbox_dir_str + os.sep + stem + ".json" for stem in stems]
 
-    print(f"✓ Visualizations saved to: {output_dir}/")
+    # The bbox files are tiny, so overlap their reads instead of opening them one by one;
+    # receipts whose file is missing report it when they are drawn
+    jobs = [
+        (img_dir_str + os.sep + name, bbox_path, out_dir_str + os.sep + "viz_" + stem + "." + fmt, bbox_data)
+        for name, stem, bbox_path, bbox_data in zip(images, stems, bbox_paths, _preload_bboxes(bbox_paths))
+    ]
+
+    # Receipts are independent, so decode/draw/encode runs in parallel processes
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if workers == 1:
+        _visualize_pipelined(jobs)
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker_logging,
+                                 initargs=(_log_queue, log.level)) as executor:
+            list(executor.map(_viz_one, jobs, chunksize=max(1, len(jobs) // (4 * workers))))
+
+    log.info(f"✓ Visualizations saved to: {output_dir}/")
 
 
 if __name__ == "__main__":
@@ -107,10 +402,16 @@ if __name__ == "__main__":
     parser.add_argument("--bbox-dir", type=str, default=None, help="Bounding box directory (if not specified, uses data_dir/bboxes)")
     parser.add_argument("--count", type=int, default=5, help="Number to visualize (batch mode)")
     parser.add_argument("--output", type=str, help="Output path for visualization")
+    parser.add_argument("--format", choices=("png", "jpg"), default="png", help="Output image format (batch mode)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes for batch mode (default: CPU count)")
 
     args = parser.parse_args()
 
-    if args.id:
-        visualize_receipt(args.id, args.data, args.bbox_dir, args.output)
-    else:
-        visualize_batch(args.data, args.bbox_dir, args.count)
\ No newline at end of file
+    listener = configure_logging()
+    try:
+        if args.id:
+            visualize_receipt(args.id, args.data, args.bbox_dir, args.output)
+        else:
+            visualize_batch(args.data, args.bbox_dir, args.count, args.workers, args.format)
+    finally:
+        listener.stop()
\ No newline at end of file